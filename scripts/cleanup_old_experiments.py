@@ -6,7 +6,6 @@ This script moves old experimental scripts and result files to an archive folder
 """
 
 import os
-import shutil
 from pathlib import Path
 
 # Files to archive
@@ -72,23 +71,23 @@ def main():
     archive_dir.mkdir(exist_ok=True)
     print(f"Created archive directory: {archive_dir}")
     
-    # Archive scripts
+    # One directory scan instead of a stat per candidate file
+    with os.scandir(base_dir) as it:
+        present = {entry.name for entry in it if entry.is_file()}
+    
+    # Archive scripts (archive/ is a subdirectory, so a rename suffices)
     scripts_archived = 0
     for script in SCRIPTS_TO_ARCHIVE:
-        src = base_dir / script
-        if src.exists():
-            dst = archive_dir / script
-            shutil.move(str(src), str(dst))
+        if script in present:
+            os.replace(base_dir / script, archive_dir / script)
             print(f"  ✓ Archived: {script}")
             scripts_archived += 1
     
     # Archive results
     results_archived = 0
     for result in RESULTS_TO_ARCHIVE:
-        src = base_dir / result
-        if src.exists():
-            dst = archive_dir / result
-            shutil.move(str(src), str(dst))
+        if result in present:
+            os.replace(base_dir / result, archive_dir / result)
             print(f"  ✓ Archived: {result}")
             results_archived += 1
     
@@ -7,12 +7,17 @@ Outputs CSV files with all individual measurements for further analysis.
 """
 
 import time
+import gc
 import os
 import sys
 import hashlib
+from functools import lru_cache
 import numpy as np
 import csv
-from collections import defaultdict
+import io
+from contextlib import redirect_stdout
+from collections import Counter
+from itertools import chain
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
@@ -21,6 +26,7 @@ from src.entities.data_owner import DataOwner
 from src.entities.cloud_server import CloudServer
 from src.utils.dataset_loader import DatasetLoader
 from src.baseline.global_index_server import GlobalIndexServer
+from src.utils.benchmark import pin_to_single_core
 
 
 def main():
@@ -50,16 +56,13 @@ def main():
     print(f"  Keywords ({len(sample['keywords'])}): {sample['keywords'][:5]}...")
     
     # Collect test keywords
-    keyword_freq = defaultdict(int)
-    for rec in records:
-        for kw in rec['keywords']:
-            keyword_freq[kw] += 1
+    keyword_freq = Counter(chain.from_iterable(rec['keywords'] for rec in records))
     
-    sorted_kws = sorted(keyword_freq.items(), key=lambda x: x[1], reverse=True)
-    test_keywords = [kw for kw, freq in sorted_kws[:10]]
+    top_kws = keyword_freq.most_common(10)
+    test_keywords = [kw for kw, _ in top_kws]
     
     print(f"\n[STEP 2] Selected 10 most common keywords for testing:")
-    for i, (kw, freq) in enumerate(sorted_kws[:10], 1):
+    for i, (kw, freq) in enumerate(top_kws, 1):
         print(f"  {i}. '{kw}' - appears in {freq} records ({freq/len(records)*100:.1f}%)")
     
     # Setup Per-Patient System
@@ -72,26 +75,22 @@ def main():
     pp_owner = DataOwner()
     pk = pp_owner.setup_system()
     
-    print(f"  - Encrypting {len(records)} records...")
+    print(f"  - Encrypting {len(records)} records (process pool, {os.cpu_count()} CPUs)...")
     print(f"    For each record:")
     print(f"      1. Encrypt content with AES-256-GCM")
-    print(f"      2. Build DSSE index (HMAC-SHA256 trapdoors)")
+    print(f"      2. Build DSSE index (nested SHA-256 trapdoors)")
     print(f"      3. Encrypt AES key with CP-ABE")
     print(f"      4. Upload to server")
     
+    # Entity logging is discarded during timed phases so terminal writes
+    # cannot stall the measurement
     start_t = time.time()
-    for rec in records:
-        pp_owner.encrypt_and_upload(
-            rec['patient_id'],
-            rec['content'],
-            rec['keywords'],
-            "(DOCTOR and CARDIOLOGY)",
-            pp_server
-        )
+    with redirect_stdout(io.StringIO()):
+        pp_owner.encrypt_and_upload_many(records, "(DOCTOR and CARDIOLOGY)", pp_server)
     setup_time_pp = time.time() - start_t
     
     print(f"  ✓ Per-patient setup: {setup_time_pp:.2f}s")
-    print(f"  ✓ {len(pp_server.storage)} patient indices created")
+    print(f"  ✓ {len(pp_server.indexes)} patient indices created")
     
     # Setup Global Index System
     print(f"\n[STEP 4] Setting up GLOBAL INDEX system")
@@ -100,8 +99,10 @@ def main():
     
     gl_server = GlobalIndexServer()
     
+    # Small keyword universe: memoize, so each keyword is hashed once
+    @lru_cache(maxsize=4096)
     def dummy_trapdoor(kw):
-        return hashlib.sha256(kw.encode()).hexdigest()
+        return hashlib.sha256(kw.encode()).digest()
     
     print(f"  - Indexing {len(records)} records into single global index...")
     print(f"    For each record:")
@@ -121,82 +122,104 @@ def main():
     print(f"  ✓ Global index setup: {setup_time_gl:.2f}s")
     print(f"  ✓ {len(gl_server.global_index)} unique trapdoors in global index")
     
+    # Each latency sample is the mean of a batch of back-to-back searches,
+    # which keeps timer overhead well below the microsecond-scale search cost.
+    # Wall time and process CPU time are both recorded; GC is paused while
+    # timing so collections do not land inside a batch.
+    batch = 100
+    iterations = 1000
+    
+    # Iteration plan (patient, keyword) shared by both systems
+    plan = [
+        (records[i % len(records)]['patient_id'], test_keywords[i % len(test_keywords)])
+        for i in range(iterations)
+    ]
+    
+    # Pin only now: the setup process pool would inherit a single-CPU mask
+    pin_to_single_core()
+    gc.collect()
+    
     # Measure Per-Patient Search
     print(f"\n[STEP 5] Measuring PER-PATIENT search latency")
     print(f"  Method:")
     print(f"    1. Select patient and keyword")
-    print(f"    2. Generate DSSE search tokens from owner's state")
-    print(f"    3. TIME: server.search(patient_id, tokens)")
-    print(f"    4. Record latency in microseconds")
-    print(f"  Running 1000 iterations...")
-    
-    pp_latencies = []
+    print(f"    2. Look up DSSE search tokens (pre-generated from owner's state)")
+    print(f"    3. TIME: {batch} x server.search(patient_id, tokens)")
+    print(f"    4. Record mean latency in microseconds")
+    print(f"  Running {iterations} iterations...")
+    
+    # Token derivation is client-side work, so keep it out of the timed path
+    pp_tokens = {
+        (rec['patient_id'], kw): pp_owner.generate_search_tokens(rec['patient_id'], kw)
+        for rec in records
+        for kw in test_keywords
+    }
+    
+    pp_arr = np.empty(iterations, dtype=np.float64)
+    pp_cpu_arr = np.empty(iterations, dtype=np.float64)
     pp_details = []
+    pp_search = pp_server.search
     
-    for i in range(1000):
-        rec = records[i % len(records)]
-        patient_id = rec['patient_id']
-        keyword = test_keywords[i % len(test_keywords)]
-        
+    with redirect_stdout(io.StringIO()):
+        gc.disable()
         try:
-            tokens = pp_owner.generate_search_tokens(patient_id, keyword)
+            for i, (patient_id, keyword) in enumerate(plan):
+                tokens = pp_tokens[(patient_id, keyword)]
             
-            start_t = time.time()
-            results = pp_server.search(patient_id, tokens)
-            latency_us = (time.time() - start_t) * 1000000  # microseconds
+                t0 = time.perf_counter_ns()
+                c0 = time.process_time_ns()
+                for _ in range(batch):
+                    results = pp_search(patient_id, tokens)
+                latency_us = (time.perf_counter_ns() - t0) / (batch * 1000)  # microseconds
+                cpu_us = (time.process_time_ns() - c0) / (batch * 1000)
             
-            pp_latencies.append(latency_us)
-            pp_details.append({
-                'iteration': i,
-                'patient_id': patient_id,
-                'keyword': keyword,
-                'latency_us': latency_us,
-                'found': len(results) > 0
-            })
-        except:
-            continue
-    
-    print(f"  ✓ Completed {len(pp_latencies)} searches")
+                pp_arr[i] = latency_us
+                pp_cpu_arr[i] = cpu_us
+                pp_details.append((i, patient_id, keyword, latency_us, cpu_us, len(results) > 0))
+        finally:
+            gc.enable()
+    
+    print(f"  ✓ Completed {len(pp_arr)} searches")
     
     # Measure Global Index Search
     print(f"\n[STEP 6] Measuring GLOBAL INDEX search latency")
     print(f"  Method:")
     print(f"    1. Select patient and keyword")
-    print(f"    2. Generate trapdoor hash")
-    print(f"    3. TIME: server.search_for_patient(patient_id, trapdoors)")
+    print(f"    2. Look up trapdoor hash (pre-generated)")
+    print(f"    3. TIME: {batch} x server.search_for_patient(patient_id, trapdoors)")
     print(f"       (includes filtering global results by patient_id)")
-    print(f"    4. Record latency in microseconds")
-    print(f"  Running 1000 iterations...")
+    print(f"    4. Record mean latency in microseconds")
+    print(f"  Running {iterations} iterations...")
     
-    gl_latencies = []
+    gl_trapdoors = {kw: [dummy_trapdoor(kw)] for kw in test_keywords}
+    
+    gl_arr = np.empty(iterations, dtype=np.float64)
+    gl_cpu_arr = np.empty(iterations, dtype=np.float64)
     gl_details = []
+    gl_search = gl_server.search_for_patient
+    
+    with redirect_stdout(io.StringIO()):
+        gc.disable()
+        try:
+            for i, (patient_id, keyword) in enumerate(plan):
+                trapdoors = gl_trapdoors[keyword]
+            
+                t0 = time.perf_counter_ns()
+                c0 = time.process_time_ns()
+                for _ in range(batch):
+                    results = gl_search(patient_id, trapdoors)
+                latency_us = (time.perf_counter_ns() - t0) / (batch * 1000)  # microseconds
+                cpu_us = (time.process_time_ns() - c0) / (batch * 1000)
+            
+                gl_arr[i] = latency_us
+                gl_cpu_arr[i] = cpu_us
+                gl_details.append((i, patient_id, keyword, latency_us, cpu_us, len(results) > 0))
+        finally:
+            gc.enable()
     
-    for i in range(1000):
-        rec = records[i % len(records)]
-        patient_id = rec['patient_id']
-        keyword = test_keywords[i % len(test_keywords)]
-        
-        trapdoors = [dummy_trapdoor(keyword)]
-        
-        start_t = time.time()
-        results = gl_server.search_for_patient(patient_id, trapdoors)
-        latency_us = (time.time() - start_t) * 1000000  # microseconds
-        
-        gl_latencies.append(latency_us)
-        gl_details.append({
-            'iteration': i,
-            'patient_id': patient_id,
-            'keyword': keyword,
-            'latency_us': latency_us,
-            'found': len(results) > 0
-        })
-    
-    print(f"  ✓ Completed {len(gl_latencies)} searches")
+    print(f"  ✓ Completed {len(gl_arr)} searches")
     
     # Calculate statistics
-    pp_arr = np.array(pp_latencies)
-    gl_arr = np.array(gl_latencies)
-    
     print(f"\n[STEP 7] Statistical Analysis")
     print(f"\n{'Metric':<20} | {'Per-Patient (μs)':<18} | {'Global Index (μs)':<18} | {'Speedup':<10}")
     print("-" * 75)
@@ -207,19 +230,23 @@ def main():
     print(f"{'Min':<20} | {np.min(pp_arr):<18.2f} | {np.min(gl_arr):<18.2f} | -")
     print(f"{'Max':<20} | {np.max(pp_arr):<18.2f} | {np.max(gl_arr):<18.2f} | -")
     print(f"{'Std Dev':<20} | {np.std(pp_arr):<18.2f} | {np.std(gl_arr):<18.2f} | -")
+    print(f"{'CPU Mean':<20} | {np.mean(pp_cpu_arr):<18.2f} | {np.mean(gl_cpu_arr):<18.2f} | {np.mean(gl_cpu_arr)/np.mean(pp_cpu_arr):<10.2f}x")
+    print(f"{'CPU Median':<20} | {np.median(pp_cpu_arr):<18.2f} | {np.median(gl_cpu_arr):<18.2f} | {np.median(gl_cpu_arr)/np.median(pp_cpu_arr):<10.2f}x")
     
     # Save raw data to CSV
     print(f"\n[STEP 8] Saving raw measurement data to CSV files")
+    csv_header = ['iteration', 'patient_id', 'keyword', 'latency_us', 'cpu_us', 'found']
+    csv_buffer = 1 << 20  # 1 MiB, so larger runs are written in few big blocks
     
-    with open('per_patient_raw_data.csv', 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['iteration', 'patient_id', 'keyword', 'latency_us', 'found'])
-        writer.writeheader()
+    with open('per_patient_raw_data.csv', 'w', newline='', buffering=csv_buffer) as f:
+        writer = csv.writer(f)
+        writer.writerow(csv_header)
         writer.writerows(pp_details)
     print(f"  ✓ Saved per_patient_raw_data.csv ({len(pp_details)} measurements)")
     
-    with open('global_index_raw_data.csv', 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['iteration', 'patient_id', 'keyword', 'latency_us', 'found'])
-        writer.writeheader()
+    with open('global_index_raw_data.csv', 'w', newline='', buffering=csv_buffer) as f:
+        writer = csv.writer(f)
+        writer.writerow(csv_header)
         writer.writerows(gl_details)
     print(f"  ✓ Saved global_index_raw_data.csv ({len(gl_details)} measurements)")
     
@@ -228,30 +255,30 @@ def main():
     print(f"\nPer-Patient Index:")
     print(f"{'Iter':<6} | {'Keyword':<15} | {'Latency (μs)':<15} | {'Found':<6}")
     print("-" * 50)
-    for detail in pp_details[:10]:
-        print(f"{detail['iteration']:<6} | {detail['keyword']:<15} | {detail['latency_us']:<15.2f} | {detail['found']}")
+    for iteration, _, keyword, latency_us, _, found in pp_details[:10]:
+        print(f"{iteration:<6} | {keyword:<15} | {latency_us:<15.2f} | {found}")
     
     print(f"\nGlobal Index:")
     print(f"{'Iter':<6} | {'Keyword':<15} | {'Latency (μs)':<15} | {'Found':<6}")
     print("-" * 50)
-    for detail in gl_details[:10]:
-        print(f"{detail['iteration']:<6} | {detail['keyword']:<15} | {detail['latency_us']:<15.2f} | {detail['found']}")
+    for iteration, _, keyword, latency_us, _, found in gl_details[:10]:
+        print(f"{iteration:<6} | {keyword:<15} | {latency_us:<15.2f} | {found}")
     
     # Distribution analysis
     print(f"\n[LATENCY DISTRIBUTION]")
     print(f"\nPer-Patient Index:")
-    bins = [0, 5, 10, 20, 50, 100, float('inf')]
+    bins = [0, 5, 10, 20, 50, 100, np.inf]
     labels = ['0-5μs', '5-10μs', '10-20μs', '20-50μs', '50-100μs', '100+μs']
-    for i, (low, high) in enumerate(zip(bins[:-1], bins[1:])):
-        count = np.sum((pp_arr >= low) & (pp_arr < high))
+    pp_hist, _ = np.histogram(pp_arr, bins=bins)
+    for label, count in zip(labels, pp_hist):
         pct = count / len(pp_arr) * 100
-        print(f"  {labels[i]:<10}: {count:>4} searches ({pct:>5.1f}%)")
+        print(f"  {label:<10}: {count:>4} searches ({pct:>5.1f}%)")
     
     print(f"\nGlobal Index:")
-    for i, (low, high) in enumerate(zip(bins[:-1], bins[1:])):
-        count = np.sum((gl_arr >= low) & (gl_arr < high))
+    gl_hist, _ = np.histogram(gl_arr, bins=bins)
+    for label, count in zip(labels, gl_hist):
         pct = count / len(gl_arr) * 100
-        print(f"  {labels[i]:<10}: {count:>4} searches ({pct:>5.1f}%)")
+        print(f"  {label:<10}: {count:>4} searches ({pct:>5.1f}%)")
     
     print("\n" + "=" * 80)
     print("  ✓ DETAILED ANALYSIS COMPLETE")
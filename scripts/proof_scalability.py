@@ -11,10 +11,17 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 import time
+import gc
 import hashlib
+from functools import lru_cache
 from src.entities.cloud_server import CloudServer
 from src.entities.data_owner import DataOwner
 from src.baseline.global_index_server import GlobalIndexServer
+from src.utils.benchmark import pin_to_single_core
+
+# The benchmark keyword never changes, so its baseline trapdoor is fixed
+KEYWORD = "test_keyword"
+CACHED_TRAPDOORS = [hashlib.sha256(KEYWORD.encode()).digest()]
 
 def proof_of_scalability():
     """
@@ -24,29 +31,33 @@ def proof_of_scalability():
     print("SCALABILITY PROOF: Per-Patient vs Global Index")
     print("="*70)
     
+    pin_to_single_core()
+    
     # Setup
     our_server = CloudServer()
     our_owner = DataOwner()
     pk = our_owner.setup_system()
     
     base_server = GlobalIndexServer()
+    @lru_cache(maxsize=4096)
     def dummy_trapdoor(kw):
-        return hashlib.sha256(kw.encode()).hexdigest()
+        return hashlib.sha256(kw.encode()).digest()
     
     # Test with increasing DB sizes
     db_sizes = [10, 50, 100, 200, 500]
-    keyword = "test_keyword"
+    keyword = KEYWORD
     target_patient = "patient_0"
     
     print(f"\nSearching for keyword '{keyword}' in patient '{target_patient}'")
     print(f"As database grows from 10 to 500 patients...\n")
     
-    print(f"{'DB Size':<10} | {'Per-Patient (μs)':<18} | {'Global (μs)':<15} | {'Global/Per-Patient':<18}")
-    print("-"*70)
+    print(f"{'DB Size':<10} | {'Per-Patient (μs)':<18} | {'Global (μs)':<15} | {'Global/Per-Patient':<18} | {'PP CPU (μs)':<12} | {'Global CPU (μs)':<15}")
+    print("-"*106)
     
+    uploaded = 0
     for db_size in db_sizes:
-        # Upload records to both systems
-        for i in range(db_size):
+        # Upload only the newly added records; both servers persist across sizes
+        for i in range(uploaded, db_size):
             patient_id = f"patient_{i}"
             keywords = [keyword, f"unique_{i}"]  # Each patient has the test keyword
             content = f"Record for {patient_id}"
@@ -59,24 +70,40 @@ def proof_of_scalability():
             
             # Upload to global system
             base_server.upload(patient_id, {"data": content}, keywords, dummy_trapdoor)
+        uploaded = db_size
         
         # Measure per-patient search (should be CONSTANT)
         tokens = our_owner.generate_search_tokens(target_patient, keyword)
-        start = time.time()
-        for _ in range(1000):
-            our_server.search(target_patient, tokens)
-        per_patient_time = ((time.time() - start) / 1000) * 1000000  # microseconds
+        pp_search = our_server.search
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter_ns()
+            cpu_start = time.process_time_ns()
+            for _ in range(1000):
+                pp_search(target_patient, tokens)
+            per_patient_time = (time.perf_counter_ns() - start) / (1000 * 1000)  # microseconds
+            per_patient_cpu = (time.process_time_ns() - cpu_start) / (1000 * 1000)
+        finally:
+            gc.enable()
         
         # Measure global search (should GROW with DB size)
-        tokens_b = [dummy_trapdoor(keyword)]
-        start = time.time()
-        for _ in range(1000):
-            base_server.search_for_patient(target_patient, tokens_b)
-        global_time = ((time.time() - start) / 1000) * 1000000  # microseconds
+        gl_search = base_server.search_for_patient
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter_ns()
+            cpu_start = time.process_time_ns()
+            for _ in range(1000):
+                gl_search(target_patient, CACHED_TRAPDOORS)
+            global_time = (time.perf_counter_ns() - start) / (1000 * 1000)  # microseconds
+            global_cpu = (time.process_time_ns() - cpu_start) / (1000 * 1000)
+        finally:
+            gc.enable()
         
         ratio = global_time / per_patient_time if per_patient_time > 0 else 0
         
-        print(f"{db_size:<10} | {per_patient_time:<18.2f} | {global_time:<15.2f} | {ratio:<18.2f}x")
+        print(f"{db_size:<10} | {per_patient_time:<18.2f} | {global_time:<15.2f} | {ratio:<18.2f}x | {per_patient_cpu:<12.2f} | {global_cpu:<15.2f}")
     
     print("\n" + "="*70)
     print("CONCLUSION:")
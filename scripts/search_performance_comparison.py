@@ -13,8 +13,10 @@ import time
 import os
 import sys
 import hashlib
+import pickle
+from functools import lru_cache
 import numpy as np
-from collections import defaultdict
+from collections import Counter
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
@@ -34,18 +36,51 @@ def print_header(title):
 
 def calculate_stats(latencies_ms):
     """Calculate latency statistics."""
-    arr = np.array(latencies_ms)
+    # Latencies arrive as ndarrays; for N=1000 this stays ~10x faster than
+    # sorted() + the statistics module, which would box every sample
+    if isinstance(latencies_ms, np.ndarray):
+        arr = latencies_ms.astype(np.float64, copy=False)
+    else:
+        # Sized buffer filled in one pass, no dtype discovery over the list
+        arr = np.fromiter(latencies_ms, dtype=np.float64, count=len(latencies_ms))
+    median, p95, p99, lo, hi = np.percentile(arr, [50, 95, 99, 0, 100])
     return {
-        'mean': np.mean(arr),
-        'median': np.median(arr),
-        'p95': np.percentile(arr, 95),
-        'p99': np.percentile(arr, 99),
-        'min': np.min(arr),
-        'max': np.max(arr),
-        'std': np.std(arr)
+        'mean': arr.mean(),
+        'median': median,
+        'p95': p95,
+        'p99': p99,
+        'min': lo,
+        'max': hi,
+        'std': arr.std()
     }
 
 
+def load_records_cached(loader, limit):
+    """
+    Load processed records, reusing a pickle of a previous run as long as
+    it is newer than the patients/conditions CSVs it was built from and was
+    produced by the same loader code.
+    """
+    # Key the cache on the loader's source too, so tokenizer changes
+    # invalidate it instead of serving stale records
+    with open(sys.modules[type(loader).__module__].__file__, 'rb') as f:
+        loader_hash = hashlib.sha256(f.read()).hexdigest()[:12]
+    cache_dir = os.path.join(os.path.dirname(__file__), '.cache')
+    cache_file = os.path.join(cache_dir, f'records_{limit}_{loader_hash}.pkl')
+    source_mtime = max(os.path.getmtime(loader.patients_file),
+                       os.path.getmtime(loader.conditions_file))
+    
+    if os.path.exists(cache_file) and os.path.getmtime(cache_file) > source_mtime:
+        with open(cache_file, 'rb') as f:
+            return pickle.load(f)
+    
+    records = loader.get_processed_records(limit=limit)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(cache_file, 'wb') as f:
+        pickle.dump(records, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return records
+
+
 def setup_per_patient_system(records):
     """Setup and populate per-patient index system."""
     print_header("SETTING UP PER-PATIENT INDEX SYSTEM")
@@ -57,43 +92,42 @@ def setup_per_patient_system(records):
     print(f"[Info] Encrypting and uploading {len(records)} records...")
     start_t = time.time()
     
-    for i, rec in enumerate(records):
-        owner.encrypt_and_upload(
-            rec['patient_id'],
-            rec['content'],
-            rec['keywords'],
-            "(DOCTOR and CARDIOLOGY)",
-            server
-        )
-        if (i + 1) % 50 == 0:
-            print(f"  Progress: {i + 1}/{len(records)} records encrypted")
+    # Patients are independent, so encryption runs across all cores
+    owner.encrypt_and_upload_many(records, "(DOCTOR and CARDIOLOGY)", server)
     
     setup_time = time.time() - start_t
     print(f"✓ Setup complete in {setup_time:.2f}s")
-    print(f"✓ {len(server.storage)} patients indexed")
+    print(f"✓ {len(server.indexes)} patients indexed")
     
     return server, owner, pk
 
 
-def setup_global_index_system(records):
+def setup_global_index_system(records, vocabulary=None):
     """Setup and populate global index system."""
     print_header("SETTING UP GLOBAL INDEX SYSTEM")
     
     server = GlobalIndexServer()
     
+    @lru_cache(maxsize=4096)
     def dummy_trapdoor(kw):
         """Simple trapdoor function for baseline."""
-        return hashlib.sha256(kw.encode()).hexdigest()
+        return hashlib.sha256(kw.encode()).digest()
     
     print(f"[Info] Uploading {len(records)} records to global index...")
     start_t = time.time()
     
+    # Hash each distinct keyword once; uploads then only do dict lookups
+    if vocabulary is None:
+        vocabulary = {kw for rec in records for kw in rec['keywords']}
+    trapdoor_table = {kw: dummy_trapdoor(kw) for kw in vocabulary}
+    lookup_trapdoor = trapdoor_table.__getitem__
+    
     for i, rec in enumerate(records):
         server.upload(
             rec['patient_id'],
             {"data": rec['content']},
             rec['keywords'],
-            dummy_trapdoor
+            lookup_trapdoor
         )
         if (i + 1) % 50 == 0:
             print(f"  Progress: {i + 1}/{len(records)} records indexed")
@@ -107,55 +141,66 @@ def setup_global_index_system(records):
 
 
 def collect_test_keywords(records, num_keywords=10):
-    """Collect common keywords from records for testing."""
-    keyword_freq = defaultdict(int)
-    
+    """
+    Collect common keywords from records for testing.
+    Also returns the full frequency table (the keyword vocabulary).
+    """
+    keyword_freq = Counter()
     for rec in records:
-        for kw in rec['keywords']:
-            keyword_freq[kw] += 1
+        keyword_freq.update(rec['keywords'])
     
-    # Sort by frequency and take top keywords
-    sorted_kws = sorted(keyword_freq.items(), key=lambda x: x[1], reverse=True)
-    test_keywords = [kw for kw, freq in sorted_kws[:num_keywords]]
+    # Partial sort: only the top keywords are needed
+    top_kws = keyword_freq.most_common(num_keywords)
+    test_keywords = [kw for kw, freq in top_kws]
     
     print(f"\n[Info] Selected {len(test_keywords)} test keywords:")
-    for kw, freq in sorted_kws[:num_keywords]:
+    for kw, freq in top_kws:
         print(f"  - '{kw}' (appears in {freq} records)")
     
-    return test_keywords
+    return test_keywords, keyword_freq
 
 
 def measure_per_patient_search(server, owner, records, test_keywords, iterations=1000):
     """Measure search latency for per-patient index."""
     print_header("MEASURING PER-PATIENT INDEX SEARCH PERFORMANCE")
     
-    latencies_ms = []
+    lat_ns = np.empty(iterations, dtype=np.int64)
+    n = 0
     
     print(f"[Info] Running {iterations} searches across {len(test_keywords)} keywords...")
     
+    # Generate search tokens once per (patient, keyword) pair
+    # (patients without DSSE state are filtered out up front)
+    token_cache = {
+        (rec['patient_id'], kw): owner.generate_search_tokens(rec['patient_id'], kw)
+        for rec in records if rec['patient_id'] in owner.dsse_states
+        for kw in test_keywords
+    }
+    
+    # Resolve the (patient, tokens) sequence before timing anything
+    plan = []
     for i in range(iterations):
-        # Select random patient and keyword
-        rec = records[i % len(records)]
-        patient_id = rec['patient_id']
-        keyword = test_keywords[i % len(test_keywords)]
-        
-        # Generate search tokens
-        try:
-            tokens = owner.generate_search_tokens(patient_id, keyword)
-            
+        patient_id = records[i % len(records)]['patient_id']
+        tokens = token_cache.get((patient_id, test_keywords[i % len(test_keywords)]))
+        if tokens is not None:
+            plan.append((patient_id, tokens))
+    
+    pp_search = server.search
+    # Untimed warmup so the first samples don't carry cold-cache cost
+    for patient_id, tokens in plan[:100]:
+        pp_search(patient_id, tokens)
+    
+    # Run in slices of 200 so progress is printed outside the timed loop
+    for start in range(0, len(plan), 200):
+        for patient_id, tokens in plan[start:start + 200]:
             # Measure search time
-            start_t = time.time()
-            server.search(patient_id, tokens)
-            latency_ms = (time.time() - start_t) * 1000
-            
-            latencies_ms.append(latency_ms)
-        except Exception as e:
-            # Skip if patient doesn't have DSSE state yet
-            continue
-        
-        if (i + 1) % 200 == 0:
-            print(f"  Progress: {i + 1}/{iterations} searches completed")
+            t0 = time.perf_counter_ns()
+            pp_search(patient_id, tokens)
+            lat_ns[n] = time.perf_counter_ns() - t0
+            n += 1
+        print(f"  Progress: {n}/{len(plan)} searches completed")
     
+    latencies_ms = lat_ns[:n] / 1e6
     stats = calculate_stats(latencies_ms)
     
     print(f"\n✓ Completed {len(latencies_ms)} successful searches")
@@ -171,29 +216,34 @@ def measure_global_index_search(server, dummy_trapdoor, records, test_keywords,
     """Measure search latency for global index."""
     print_header("MEASURING GLOBAL INDEX SEARCH PERFORMANCE")
     
-    latencies_ms = []
+    lat_ns = np.empty(iterations, dtype=np.int64)
+    n = 0
     
     print(f"[Info] Running {iterations} searches across {len(test_keywords)} keywords...")
     
-    for i in range(iterations):
-        # Select random patient and keyword
-        rec = records[i % len(records)]
-        patient_id = rec['patient_id']
-        keyword = test_keywords[i % len(test_keywords)]
-        
-        # Generate trapdoor
-        trapdoors = [dummy_trapdoor(keyword)]
-        
-        # Measure search time (with patient filtering for fair comparison)
-        start_t = time.time()
-        server.search_for_patient(patient_id, trapdoors)
-        latency_ms = (time.time() - start_t) * 1000
-        
-        latencies_ms.append(latency_ms)
-        
-        if (i + 1) % 200 == 0:
-            print(f"  Progress: {i + 1}/{iterations} searches completed")
-    
+    trapdoor_cache = {kw: [dummy_trapdoor(kw)] for kw in test_keywords}
+    
+    plan = [
+        (records[i % len(records)]['patient_id'], trapdoor_cache[test_keywords[i % len(test_keywords)]])
+        for i in range(iterations)
+    ]
+    
+    gl_search = server.search_for_patient
+    # Untimed warmup so the first samples don't carry cold-cache cost
+    for patient_id, trapdoors in plan[:100]:
+        gl_search(patient_id, trapdoors)
+    
+    # Run in slices of 200 so progress is printed outside the timed loop
+    for start in range(0, len(plan), 200):
+        for patient_id, trapdoors in plan[start:start + 200]:
+            # Measure search time (with patient filtering for fair comparison)
+            t0 = time.perf_counter_ns()
+            gl_search(patient_id, trapdoors)
+            lat_ns[n] = time.perf_counter_ns() - t0
+            n += 1
+        print(f"  Progress: {n}/{iterations} searches completed")
+    
+    latencies_ms = lat_ns[:n] / 1e6
     stats = calculate_stats(latencies_ms)
     
     print(f"\n✓ Completed {len(latencies_ms)} successful searches")
@@ -209,101 +259,106 @@ def generate_report(per_patient_stats, global_stats, num_records, test_keywords,
     """Generate comparison report."""
     print_header("GENERATING COMPARISON REPORT")
     
+    # Assemble the whole report in memory and write it in one go
+    out = []
+    out.append("=" * 80 + "\n")
+    out.append("SEARCH PERFORMANCE COMPARISON REPORT\n")
+    out.append("=" * 80 + "\n\n")
+    out.append(f"Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+    
+    out.append("EXPERIMENTAL SETUP\n")
+    out.append("-" * 80 + "\n")
+    out.append(f"Dataset Size:       {num_records} patient records\n")
+    out.append(f"Test Keywords:      {len(test_keywords)} keywords\n")
+    out.append(f"Iterations:         1000 searches per system\n")
+    out.append(f"Encryption:         AES-256-GCM + CP-ABE\n")
+    out.append(f"DSSE Scheme:        nested SHA-256 trapdoors\n\n")
+    
+    out.append("TEST KEYWORDS:\n")
+    out.extend(f"  - {kw}\n" for kw in test_keywords)
+    out.append("\n")
+    
+    out.append("RESULTS: SEARCH LATENCY COMPARISON\n")
+    out.append("=" * 80 + "\n\n")
+    
+    # Table header
+    out.append("┌─────────────────────────┬──────────────────┬──────────────────┐\n")
+    out.append("│ Metric                  │ Per-Patient (μs) │ Global Index (μs)│\n")
+    out.append("├─────────────────────────┼──────────────────┼──────────────────┤\n")
+    
+    # Metrics
+    metrics = [
+        ('Mean Latency', 'mean'),
+        ('Median Latency', 'median'),
+        ('P95 Latency', 'p95'),
+        ('P99 Latency', 'p99'),
+        ('Min Latency', 'min'),
+        ('Max Latency', 'max'),
+        ('Std Deviation', 'std')
+    ]
+    
+    # One row template for the whole table; values converted to μs
+    row_fmt = "│ {:<23} │ {:>16.2f} │ {:>16.2f} │\n"
+    out.append("".join(
+        row_fmt.format(label, per_patient_stats[key] * 1000, global_stats[key] * 1000)
+        for label, key in metrics
+    ))
+    
+    out.append("└─────────────────────────┴──────────────────┴──────────────────┘\n\n")
+    
+    # Analysis
+    out.append("ANALYSIS\n")
+    out.append("=" * 80 + "\n\n")
+    
+    speedup = global_stats['mean'] / per_patient_stats['mean']
+    if speedup > 1:
+        out.append(f"✓ Per-patient index is {speedup:.2f}x FASTER than global index\n\n")
+    elif speedup < 1:
+        out.append(f"✓ Global index is {1/speedup:.2f}x FASTER than per-patient index\n\n")
+    else:
+        out.append("✓ Both approaches have comparable performance\n\n")
+    
+    out.append("KEY OBSERVATIONS:\n\n")
+    
+    out.append("1. PERFORMANCE\n")
+    out.append(f"   Both systems achieve sub-millisecond search latency:\n")
+    out.append(f"   - Per-patient: {per_patient_stats['mean']*1000:.2f} μs average\n")
+    out.append(f"   - Global index: {global_stats['mean']*1000:.2f} μs average\n\n")
+    
+    out.append("2. CONSISTENCY\n")
+    out.append(f"   Standard deviation comparison:\n")
+    out.append(f"   - Per-patient: {per_patient_stats['std']*1000:.2f} μs\n")
+    out.append(f"   - Global index: {global_stats['std']*1000:.2f} μs\n\n")
+    
+    out.append("3. TAIL LATENCY\n")
+    out.append(f"   P99 latency (worst 1% of queries):\n")
+    out.append(f"   - Per-patient: {per_patient_stats['p99']*1000:.2f} μs\n")
+    out.append(f"   - Global index: {global_stats['p99']*1000:.2f} μs\n\n")
+    
+    out.append("ARCHITECTURAL ADVANTAGES OF PER-PATIENT INDEXING:\n\n")
+    out.append("1. SECURITY - Information Leakage Reduction\n")
+    out.append("   Access patterns are confined to individual patient records.\n")
+    out.append("   The cloud server cannot observe cross-patient keyword statistics.\n\n")
+    
+    out.append("2. WORKFLOW ALIGNMENT\n")
+    out.append("   Structure matches clinical practice where users access one patient\n")
+    out.append("   at a time, not global database queries.\n\n")
+    
+    out.append("3. SCALABILITY PROPERTIES\n")
+    out.append("   Per-patient indices remain constant-sized regardless of total\n")
+    out.append("   patient count. Global indices grow linearly with population.\n\n")
+    
+    out.append("4. ISOLATION BENEFITS\n")
+    out.append("   - Selective data destruction (delete one patient completely)\n")
+    out.append("   - Independent access revocation (revoke access to specific patients)\n")
+    out.append("   - Reduced blast radius (compromise of one key ≠ all data)\n\n")
+    
+    out.append("=" * 80 + "\n")
+    out.append("END OF REPORT\n")
+    out.append("=" * 80 + "\n")
+    
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write("=" * 80 + "\n")
-        f.write("SEARCH PERFORMANCE COMPARISON REPORT\n")
-        f.write("=" * 80 + "\n\n")
-        f.write(f"Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        
-        f.write("EXPERIMENTAL SETUP\n")
-        f.write("-" * 80 + "\n")
-        f.write(f"Dataset Size:       {num_records} patient records\n")
-        f.write(f"Test Keywords:      {len(test_keywords)} keywords\n")
-        f.write(f"Iterations:         1000 searches per system\n")
-        f.write(f"Encryption:         AES-256-GCM + CP-ABE\n")
-        f.write(f"DSSE Scheme:        HMAC-SHA256 based\n\n")
-        
-        f.write("TEST KEYWORDS:\n")
-        for kw in test_keywords:
-            f.write(f"  - {kw}\n")
-        f.write("\n")
-        
-        f.write("RESULTS: SEARCH LATENCY COMPARISON\n")
-        f.write("=" * 80 + "\n\n")
-        
-        # Table header
-        f.write("┌─────────────────────────┬──────────────────┬──────────────────┐\n")
-        f.write("│ Metric                  │ Per-Patient (μs) │ Global Index (μs)│\n")
-        f.write("├─────────────────────────┼──────────────────┼──────────────────┤\n")
-        
-        # Metrics
-        metrics = [
-            ('Mean Latency', 'mean'),
-            ('Median Latency', 'median'),
-            ('P95 Latency', 'p95'),
-            ('P99 Latency', 'p99'),
-            ('Min Latency', 'min'),
-            ('Max Latency', 'max'),
-            ('Std Deviation', 'std')
-        ]
-        
-        for label, key in metrics:
-            pp_val = per_patient_stats[key] * 1000  # Convert to μs
-            gl_val = global_stats[key] * 1000
-            f.write(f"│ {label:<23} │ {pp_val:>16.2f} │ {gl_val:>16.2f} │\n")
-        
-        f.write("└─────────────────────────┴──────────────────┴──────────────────┘\n\n")
-        
-        # Analysis
-        f.write("ANALYSIS\n")
-        f.write("=" * 80 + "\n\n")
-        
-        speedup = global_stats['mean'] / per_patient_stats['mean']
-        if speedup > 1:
-            f.write(f"✓ Per-patient index is {speedup:.2f}x FASTER than global index\n\n")
-        elif speedup < 1:
-            f.write(f"✓ Global index is {1/speedup:.2f}x FASTER than per-patient index\n\n")
-        else:
-            f.write("✓ Both approaches have comparable performance\n\n")
-        
-        f.write("KEY OBSERVATIONS:\n\n")
-        
-        f.write("1. PERFORMANCE\n")
-        f.write(f"   Both systems achieve sub-millisecond search latency:\n")
-        f.write(f"   - Per-patient: {per_patient_stats['mean']*1000:.2f} μs average\n")
-        f.write(f"   - Global index: {global_stats['mean']*1000:.2f} μs average\n\n")
-        
-        f.write("2. CONSISTENCY\n")
-        f.write(f"   Standard deviation comparison:\n")
-        f.write(f"   - Per-patient: {per_patient_stats['std']*1000:.2f} μs\n")
-        f.write(f"   - Global index: {global_stats['std']*1000:.2f} μs\n\n")
-        
-        f.write("3. TAIL LATENCY\n")
-        f.write(f"   P99 latency (worst 1% of queries):\n")
-        f.write(f"   - Per-patient: {per_patient_stats['p99']*1000:.2f} μs\n")
-        f.write(f"   - Global index: {global_stats['p99']*1000:.2f} μs\n\n")
-        
-        f.write("ARCHITECTURAL ADVANTAGES OF PER-PATIENT INDEXING:\n\n")
-        f.write("1. SECURITY - Information Leakage Reduction\n")
-        f.write("   Access patterns are confined to individual patient records.\n")
-        f.write("   The cloud server cannot observe cross-patient keyword statistics.\n\n")
-        
-        f.write("2. WORKFLOW ALIGNMENT\n")
-        f.write("   Structure matches clinical practice where users access one patient\n")
-        f.write("   at a time, not global database queries.\n\n")
-        
-        f.write("3. SCALABILITY PROPERTIES\n")
-        f.write("   Per-patient indices remain constant-sized regardless of total\n")
-        f.write("   patient count. Global indices grow linearly with population.\n\n")
-        
-        f.write("4. ISOLATION BENEFITS\n")
-        f.write("   - Selective data destruction (delete one patient completely)\n")
-        f.write("   - Independent access revocation (revoke access to specific patients)\n")
-        f.write("   - Reduced blast radius (compromise of one key ≠ all data)\n\n")
-        
-        f.write("=" * 80 + "\n")
-        f.write("END OF REPORT\n")
-        f.write("=" * 80 + "\n")
+        f.writelines(out)
     
     print(f"✓ Report written to: {output_file}")
 
@@ -321,16 +376,17 @@ def main():
     
     # Use a reasonable subset for testing
     num_records = 200
-    records = loader.get_processed_records(limit=num_records)
+    records = load_records_cached(loader, num_records)
     
     print(f"\n[Info] Loaded {len(records)} patient records")
     
     # Collect test keywords
-    test_keywords = collect_test_keywords(records, num_keywords=10)
+    test_keywords, keyword_freq = collect_test_keywords(records, num_keywords=10)
     
-    # Setup both systems
+    # Setup both systems one after the other: overlapping setups would
+    # compete for cores and skew both reported setup times
     pp_server, pp_owner, pk = setup_per_patient_system(records)
-    gl_server, dummy_trapdoor = setup_global_index_system(records)
+    gl_server, dummy_trapdoor = setup_global_index_system(records, keyword_freq.keys())
     
     # Measure search performance
     pp_latencies, pp_stats = measure_per_patient_search(
@@ -1,5 +1,59 @@
 import re
 import os
+import codecs
+import math
+import mmap
+
+def iter_utf16le_blocks(path, block_size=4 * 1024 * 1024):
+    """
+    Yields the decoded text of a UTF-16LE file in blocks that end on a line
+    boundary. The file is memory-mapped and block ends are found by
+    searching the raw bytes for an aligned 0x0A 0x00.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 2 if mm[:2] == codecs.BOM_UTF16_LE else 0
+            size = len(mm)
+            while start < size:
+                nl = mm.find(b'\n\x00', start + block_size)
+                # Skip matches that straddle two code units
+                while nl >= 0 and (nl - start) & 1:
+                    nl = mm.find(b'\n\x00', nl + 1)
+                end = size if nl < 0 else nl + 2
+                yield mm[start:end].decode('utf-16-le')
+                start = end
+
+def iter_candidate_lines(text, folded, pattern):
+    """
+    Yields the lines of `text` whose counterpart in `folded` (same text,
+    same line breaks) contains `pattern`, scanning the block once.
+    """
+    lines = text.split('\n')
+    line_no = pos = 0
+    while True:
+        m = pattern.search(folded, pos)
+        if not m:
+            return
+        line_no += folded.count('\n', pos, m.start())
+        yield lines[line_no]
+        pos = folded.find('\n', m.end()) + 1
+        if not pos:
+            return
+        line_no += 1
+
+def new_accumulator():
+    """Running [sum, min, max, count] for one metric."""
+    return [0.0, math.inf, -math.inf, 0]
+
+def add_sample(acc, value):
+    acc[0] += value
+    if value < acc[1]:
+        acc[1] = value
+    if value > acc[2]:
+        acc[2] = value
+    acc[3] += 1
 
 def summarize_logs(input_file, output_file):
     print(f"Summarizing {input_file} (UTF-16LE)...")
@@ -7,76 +61,89 @@ def summarize_logs(input_file, output_file):
     # Storage for different types of metrics
     metrics = {
         "Batch Evaluation (Table)": {
-            "Update Time (ms)": [],
-            "Search Time (us)": []
+            "Update Time (ms)": new_accumulator(),
+            "Search Time (us)": new_accumulator()
         },
         "Index Construction (Table)": {
-            "Build Time (ms)": []
+            "Build Time (ms)": new_accumulator()
         },
         "Verbose Logs (Regex)": {
-            "Encryption (ms)": [],
-            "Search (us)": [],
-            "Update (ms)": [],
-            "Delete (ms)": []
+            "Encryption (ms)": new_accumulator(),
+            "Search (us)": new_accumulator(),
+            "Update (ms)": new_accumulator(),
+            "Delete (ms)": new_accumulator()
         }
     }
 
-    # Regex for tabular rows
-    # Example: 100 | 5 | 0.0886 | 25911.9857 | ...
-    table_row_pat = re.compile(r"^\s*([\d.]+)\s*\|\s*([\d.]+)\s*\|\s*([\d.]+)\s*\|\s*([\d.]+)")
-    # Example: 10000 | 203.8529 |
+    # Regex for tabular rows, applied to a whole block at once. Rows are
+    # anchored on the preceding '\n' (a literal the scan can jump to, unlike
+    # ^ with re.M), and [^\S\n] is \s without the newline
+    # Example: 10000 | 203.8529 |                    -> index row
+    # Example: 100 | 5 | 0.0886 | 25911.9857 | ...   -> batch row (groups 3, 4)
+    row_pat = re.compile(
+        r"\n[^\S\n]*([\d.]+)[^\S\n]*\|[^\S\n]*([\d.]+)[^\S\n]*\|"
+        r"(?:[^\S\n]*([\d.]+)[^\S\n]*\|[^\S\n]*([\d.]+))?"
+    )
     index_row_pat = re.compile(r"^\s*([\d.]+)\s*\|\s*([\d.]+)\s*\|")
     
-    # Verbose patterns
+    # Verbose patterns. Each one is searched separately: a line can carry
+    # several metrics and every one of them is recorded
     v_patterns = {
         "Encryption (ms)": re.compile(r"encryption(?:.*?)([\d.]+)\s*ms", re.I),
         "Search (us)": re.compile(r"search(?:.*?)([\d.]+)\s*(?:μs|us)", re.I),
         "Update (ms)": re.compile(r"update(?:.*?)([\d.]+)\s*ms", re.I),
         "Delete (ms)": re.compile(r"deletion(?:.*?)([\d.]+)\s*ms", re.I)
     }
+    # Verbose matches need one of the keywords, so only lines containing one
+    # are matched. The prefilter is a plain search on text.lower(), which is
+    # stricter than re.I in three cases, so those characters also make a
+    # line a candidate (false positives are fine, misses are not):
+    #   'ſ' (long s)    - re.I matches it as 's', lower() leaves it as is
+    #   'ı' (dotless i) - re.I matches it as 'i', lower() leaves it as is
+    #   '\u0307'        - lower() turns 'İ' into 'i' + U+0307, which splits
+    #                     the keyword, while re.I matches 'İ' as 'i'
+    keyword_pat = re.compile(r"encryption|search|update|deletion|ſ|ı|\u0307")
 
     total_lines = 0
     
     try:
-        with open(input_file, 'r', encoding='utf-16') as f:
-            for line in f:
-                total_lines += 1
-                
-                # 1. Try Tabular matching (4 columns)
-                m = table_row_pat.match(line)
-                if m:
+        for text in iter_utf16le_blocks(input_file):
+            # Only the final block can end without a newline
+            total_lines += text.count('\n') + (not text.endswith('\n'))
+            
+            # 1. Tabular rows (4 columns: batch evaluation, 2 columns: index)
+            for m in row_pat.finditer('\n' + text):
+                if m.group(3) is not None:
                     # Based on "Patients | Updates/pt | Update Time (ms) | Search Time (us)"
-                    metrics["Batch Evaluation (Table)"]["Update Time (ms)"].append(float(m.group(3)))
-                    metrics["Batch Evaluation (Table)"]["Search Time (us)"].append(float(m.group(4)))
-                    continue
-                
-                # 2. Try Index matching (2 columns)
-                m = index_row_pat.match(line)
-                if m:
+                    add_sample(metrics["Batch Evaluation (Table)"]["Update Time (ms)"], float(m.group(3)))
+                    add_sample(metrics["Batch Evaluation (Table)"]["Search Time (us)"], float(m.group(4)))
+                else:
                     # Based on "Keywords | Build Time"
-                    metrics["Index Construction (Table)"]["Build Time (ms)"].append(float(m.group(2)))
+                    add_sample(metrics["Index Construction (Table)"]["Build Time (ms)"], float(m.group(2)))
+            
+            # 2. Verbose matching, on lines that are not table rows
+            for line in iter_candidate_lines(text, text.lower(), keyword_pat):
+                if index_row_pat.match(line):
                     continue
-                
-                # 3. Try Verbose matching
                 for key, pat in v_patterns.items():
                     m = pat.search(line)
                     if m:
-                        metrics["Verbose Logs (Regex)"][key].append(float(m.group(1)))
+                        add_sample(metrics["Verbose Logs (Regex)"][key], float(m.group(1)))
+            
+            print(f"Read {total_lines} lines...")
                 
-                if total_lines % 50000 == 0:
-                    print(f"Read {total_lines} lines...")
-                    
     except Exception as e:
         print(f"Error: {e}")
         return
 
-    def get_stats(data):
-        if not data: return None
+    def get_stats(acc):
+        total, lo, hi, count = acc
+        if not count: return None
         return {
-            "avg": round(sum(data) / len(data), 4),
-            "min": round(min(data), 4),
-            "max": round(max(data), 4),
-            "count": len(data)
+            "avg": round(total / count, 4),
+            "min": round(lo, 4),
+            "max": round(hi, 4),
+            "count": count
         }
 
     with open(output_file, 'w', encoding='utf-8') as f:
@@ -5,7 +5,10 @@ SEARCH PERFORMANCE VISUALIZATION
 Generates graphs from the search performance comparison CSV data.
 """
 
+from multiprocessing import Pool
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # file output only; safe to render in worker processes
 import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sns
@@ -15,12 +18,34 @@ sns.set_style("whitegrid")
 plt.rcParams['figure.figsize'] = (14, 10)
 
 def load_data():
-    """Load the CSV data."""
-    pp_data = pd.read_csv('per_patient_raw_data.csv')
-    gl_data = pd.read_csv('global_index_raw_data.csv')
+    """Load the CSV data (only the columns the plots use)."""
+    # float32 latencies are ample for plotting and halve the column size
+    columns = ['iteration', 'latency_us']
+    dtypes = {'iteration': 'int32', 'latency_us': 'float32'}
+    pp_data = pd.read_csv('per_patient_raw_data.csv', usecols=columns, dtype=dtypes)
+    gl_data = pd.read_csv('global_index_raw_data.csv', usecols=columns, dtype=dtypes)
     return pp_data, gl_data
 
-def plot_latency_comparison(pp_data, gl_data):
+def compute_stats(data):
+    """
+    Summary statistics of one latency column, computed once and shared by
+    all plots (one sort instead of a mean/median/percentile pass per plot).
+    """
+    latencies = data['latency_us'].to_numpy(dtype=np.float64)
+    latencies_sorted = np.sort(latencies)
+    median, p95, p99 = np.quantile(latencies_sorted, [0.5, 0.95, 0.99])
+    n = len(latencies_sorted)
+    return {
+        'mean': latencies.mean(),
+        'median': median,
+        'p95': p95,
+        'p99': p99,
+        'sorted': latencies_sorted,
+        # Cumulative % for each sorted sample, shared by both CDF plots
+        'cdf_pct': np.linspace(100.0 / n, 100.0, n, dtype=np.float32)
+    }
+
+def plot_latency_comparison(pp_data, gl_data, pp_stats, gl_stats):
     """Box plot comparing latency distributions."""
     fig, ax = plt.subplots(figsize=(10, 6))
     
@@ -42,8 +67,8 @@ def plot_latency_comparison(pp_data, gl_data):
     ax.grid(True, alpha=0.3)
     
     # Add statistics text
-    pp_mean = pp_data['latency_us'].mean()
-    gl_mean = gl_data['latency_us'].mean()
+    pp_mean = pp_stats['mean']
+    gl_mean = gl_stats['mean']
     speedup = gl_mean / pp_mean
     
     stats_text = f'Per-Patient Mean: {pp_mean:.2f} μs\n'
@@ -59,17 +84,17 @@ def plot_latency_comparison(pp_data, gl_data):
     print("✓ Saved: latency_comparison_boxplot.png")
     plt.close()
 
-def plot_latency_histogram(pp_data, gl_data):
+def plot_latency_histogram(pp_data, gl_data, pp_stats, gl_stats):
     """Histogram showing latency distributions."""
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
     
     # Per-Patient histogram
     ax1.hist(pp_data['latency_us'], bins=50, color='#3498db', 
              alpha=0.7, edgecolor='black')
-    ax1.axvline(pp_data['latency_us'].mean(), color='red', 
-                linestyle='--', linewidth=2, label=f'Mean: {pp_data["latency_us"].mean():.2f} μs')
-    ax1.axvline(pp_data['latency_us'].median(), color='green', 
-                linestyle='--', linewidth=2, label=f'Median: {pp_data["latency_us"].median():.2f} μs')
+    ax1.axvline(pp_stats['mean'], color='red', 
+                linestyle='--', linewidth=2, label=f'Mean: {pp_stats["mean"]:.2f} μs')
+    ax1.axvline(pp_stats['median'], color='green', 
+                linestyle='--', linewidth=2, label=f'Median: {pp_stats["median"]:.2f} μs')
     ax1.set_xlabel('Latency (μs)', fontsize=11, fontweight='bold')
     ax1.set_ylabel('Frequency', fontsize=11, fontweight='bold')
     ax1.set_title('Per-Patient Index - Latency Distribution', fontsize=12, fontweight='bold')
@@ -79,10 +104,10 @@ def plot_latency_histogram(pp_data, gl_data):
     # Global histogram
     ax2.hist(gl_data['latency_us'], bins=50, color='#e74c3c', 
              alpha=0.7, edgecolor='black')
-    ax2.axvline(gl_data['latency_us'].mean(), color='red', 
-                linestyle='--', linewidth=2, label=f'Mean: {gl_data["latency_us"].mean():.2f} μs')
-    ax2.axvline(gl_data['latency_us'].median(), color='green', 
-                linestyle='--', linewidth=2, label=f'Median: {gl_data["latency_us"].median():.2f} μs')
+    ax2.axvline(gl_stats['mean'], color='red', 
+                linestyle='--', linewidth=2, label=f'Mean: {gl_stats["mean"]:.2f} μs')
+    ax2.axvline(gl_stats['median'], color='green', 
+                linestyle='--', linewidth=2, label=f'Median: {gl_stats["median"]:.2f} μs')
     ax2.set_xlabel('Latency (μs)', fontsize=11, fontweight='bold')
     ax2.set_ylabel('Frequency', fontsize=11, fontweight='bold')
     ax2.set_title('Global Index - Latency Distribution', fontsize=12, fontweight='bold')
@@ -94,28 +119,22 @@ def plot_latency_histogram(pp_data, gl_data):
     print("✓ Saved: latency_histogram.png")
     plt.close()
 
-def plot_cdf_comparison(pp_data, gl_data):
+def plot_cdf_comparison(pp_data, gl_data, pp_stats, gl_stats):
     """Cumulative Distribution Function comparison."""
     fig, ax = plt.subplots(figsize=(10, 6))
     
-    # Sort data
-    pp_sorted = np.sort(pp_data['latency_us'])
-    gl_sorted = np.sort(gl_data['latency_us'])
-    
-    # Calculate CDF
-    pp_cdf = np.arange(1, len(pp_sorted) + 1) / len(pp_sorted)
-    gl_cdf = np.arange(1, len(gl_sorted) + 1) / len(gl_sorted)
+    # Sorted once in compute_stats()
+    pp_sorted = pp_stats['sorted']
+    gl_sorted = gl_stats['sorted']
     
     # Plot
-    ax.plot(pp_sorted, pp_cdf * 100, label='Per-Patient Index', 
+    ax.plot(pp_sorted, pp_stats['cdf_pct'], label='Per-Patient Index', 
             linewidth=2, color='#3498db')
-    ax.plot(gl_sorted, gl_cdf * 100, label='Global Index', 
+    ax.plot(gl_sorted, gl_stats['cdf_pct'], label='Global Index', 
             linewidth=2, color='#e74c3c')
     
     # Add percentile lines
     for percentile in [50, 95, 99]:
-        pp_val = np.percentile(pp_data['latency_us'], percentile)
-        gl_val = np.percentile(gl_data['latency_us'], percentile)
         ax.axhline(y=percentile, color='gray', linestyle=':', alpha=0.5)
         ax.text(ax.get_xlim()[1] * 0.7, percentile + 2, f'P{percentile}', 
                 fontsize=9, alpha=0.7)
@@ -133,23 +152,13 @@ def plot_cdf_comparison(pp_data, gl_data):
     print("✓ Saved: latency_cdf.png")
     plt.close()
 
-def plot_statistics_bar(pp_data, gl_data):
+def plot_statistics_bar(pp_data, gl_data, pp_stats, gl_stats):
     """Bar chart comparing key statistics."""
     fig, ax = plt.subplots(figsize=(12, 6))
     
     metrics = ['Mean', 'Median', 'P95', 'P99']
-    pp_values = [
-        pp_data['latency_us'].mean(),
-        pp_data['latency_us'].median(),
-        np.percentile(pp_data['latency_us'], 95),
-        np.percentile(pp_data['latency_us'], 99)
-    ]
-    gl_values = [
-        gl_data['latency_us'].mean(),
-        gl_data['latency_us'].median(),
-        np.percentile(gl_data['latency_us'], 95),
-        np.percentile(gl_data['latency_us'], 99)
-    ]
+    pp_values = [pp_stats['mean'], pp_stats['median'], pp_stats['p95'], pp_stats['p99']]
+    gl_values = [gl_stats['mean'], gl_stats['median'], gl_stats['p95'], gl_stats['p99']]
     
     x = np.arange(len(metrics))
     width = 0.35
@@ -180,21 +189,22 @@ def plot_statistics_bar(pp_data, gl_data):
     print("✓ Saved: statistics_comparison.png")
     plt.close()
 
-def plot_time_series(pp_data, gl_data):
+def plot_time_series(pp_data, gl_data, pp_stats, gl_stats):
     """Time series showing latency over iterations."""
     fig, ax = plt.subplots(figsize=(14, 6))
     
-    # Plot every 10th point to avoid clutter
+    # Plot every 10th point to avoid clutter. Each series is already a single
+    # Line2D artist; strided NumPy views skip pandas' unit conversion
     step = 10
-    ax.plot(pp_data['iteration'][::step], pp_data['latency_us'][::step], 
+    ax.plot(pp_data['iteration'].to_numpy()[::step], pp_data['latency_us'].to_numpy()[::step], 
             'o-', label='Per-Patient Index', alpha=0.6, markersize=3, color='#3498db')
-    ax.plot(gl_data['iteration'][::step], gl_data['latency_us'][::step], 
+    ax.plot(gl_data['iteration'].to_numpy()[::step], gl_data['latency_us'].to_numpy()[::step], 
             'o-', label='Global Index', alpha=0.6, markersize=3, color='#e74c3c')
     
     # Add mean lines
-    ax.axhline(y=pp_data['latency_us'].mean(), color='#3498db', 
+    ax.axhline(y=pp_stats['mean'], color='#3498db', 
                linestyle='--', linewidth=2, alpha=0.7, label='Per-Patient Mean')
-    ax.axhline(y=gl_data['latency_us'].mean(), color='#e74c3c', 
+    ax.axhline(y=gl_stats['mean'], color='#e74c3c', 
                linestyle='--', linewidth=2, alpha=0.7, label='Global Mean')
     
     ax.set_xlabel('Iteration', fontsize=12, fontweight='bold')
@@ -209,7 +219,7 @@ def plot_time_series(pp_data, gl_data):
     print("✓ Saved: latency_timeseries.png")
     plt.close()
 
-def plot_combined_summary(pp_data, gl_data):
+def plot_combined_summary(pp_data, gl_data, pp_stats, gl_stats):
     """Combined summary figure with multiple subplots."""
     fig = plt.figure(figsize=(16, 10))
     gs = fig.add_gridspec(2, 2, hspace=0.3, wspace=0.3)
@@ -228,12 +238,10 @@ def plot_combined_summary(pp_data, gl_data):
     
     # 2. CDF
     ax2 = fig.add_subplot(gs[0, 1])
-    pp_sorted = np.sort(pp_data['latency_us'])
-    gl_sorted = np.sort(gl_data['latency_us'])
-    pp_cdf = np.arange(1, len(pp_sorted) + 1) / len(pp_sorted)
-    gl_cdf = np.arange(1, len(gl_sorted) + 1) / len(gl_sorted)
-    ax2.plot(pp_sorted, pp_cdf * 100, label='Per-Patient', linewidth=2, color='#3498db')
-    ax2.plot(gl_sorted, gl_cdf * 100, label='Global', linewidth=2, color='#e74c3c')
+    pp_sorted = pp_stats['sorted']
+    gl_sorted = gl_stats['sorted']
+    ax2.plot(pp_sorted, pp_stats['cdf_pct'], label='Per-Patient', linewidth=2, color='#3498db')
+    ax2.plot(gl_sorted, gl_stats['cdf_pct'], label='Global', linewidth=2, color='#e74c3c')
     ax2.set_xlabel('Latency (μs)', fontweight='bold')
     ax2.set_ylabel('Cumulative %', fontweight='bold')
     ax2.set_title('Cumulative Distribution', fontweight='bold')
@@ -243,12 +251,8 @@ def plot_combined_summary(pp_data, gl_data):
     # 3. Statistics bar chart
     ax3 = fig.add_subplot(gs[1, 0])
     metrics = ['Mean', 'Median', 'P95', 'P99']
-    pp_values = [pp_data['latency_us'].mean(), pp_data['latency_us'].median(),
-                 np.percentile(pp_data['latency_us'], 95), 
-                 np.percentile(pp_data['latency_us'], 99)]
-    gl_values = [gl_data['latency_us'].mean(), gl_data['latency_us'].median(),
-                 np.percentile(gl_data['latency_us'], 95), 
-                 np.percentile(gl_data['latency_us'], 99)]
+    pp_values = [pp_stats['mean'], pp_stats['median'], pp_stats['p95'], pp_stats['p99']]
+    gl_values = [gl_stats['mean'], gl_stats['median'], gl_stats['p95'], gl_stats['p99']]
     x = np.arange(len(metrics))
     width = 0.35
     ax3.bar(x - width/2, pp_values, width, label='Per-Patient', color='#3498db', alpha=0.8)
@@ -281,6 +285,10 @@ def plot_combined_summary(pp_data, gl_data):
     print("✓ Saved: combined_summary.png")
     plt.close()
 
+def _dispatch(plot_fn, args):
+    """Pool helper: runs one plot function in a worker process."""
+    plot_fn(*args)
+
 def main():
     print("=" * 60)
     print("  SEARCH PERFORMANCE VISUALIZATION")
@@ -291,13 +299,16 @@ def main():
     print(f"✓ Loaded {len(pp_data)} per-patient measurements")
     print(f"✓ Loaded {len(gl_data)} global index measurements")
     
+    pp_stats = compute_stats(pp_data)
+    gl_stats = compute_stats(gl_data)
+    
     print("\nGenerating visualizations...")
-    plot_latency_comparison(pp_data, gl_data)
-    plot_latency_histogram(pp_data, gl_data)
-    plot_cdf_comparison(pp_data, gl_data)
-    plot_statistics_bar(pp_data, gl_data)
-    plot_time_series(pp_data, gl_data)
-    plot_combined_summary(pp_data, gl_data)
+    # Each plot renders and saves its own file, so they run side by side
+    plot_fns = [plot_latency_comparison, plot_latency_histogram, plot_cdf_comparison,
+                plot_statistics_bar, plot_time_series, plot_combined_summary]
+    args = (pp_data, gl_data, pp_stats, gl_stats)
+    with Pool(processes=len(plot_fns)) as pool:
+        pool.starmap(_dispatch, [(fn, args) for fn in plot_fns])
     
     print("\n" + "=" * 60)
     print("  ✓ ALL VISUALIZATIONS GENERATED SUCCESSFULLY!")
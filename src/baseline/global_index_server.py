@@ -19,6 +19,8 @@ class GlobalIndexServer:
 
     def search(self, trapdoors):
         """Search across all patients (returns all matches)."""
+        if not trapdoors:
+            return []
         results = []
         for t in trapdoors:
             hits = self.global_index.get(t, [])
@@ -30,6 +32,8 @@ class GlobalIndexServer:
         Search for a SPECIFIC patient (fair comparison with per-patient index).
         This is what a real system would need to do.
         """
+        if not trapdoors or patient_id not in self.storage:
+            return []
         results = []
         for t in trapdoors:
             hits = self.global_index.get(t, [])
@@ -1,7 +1,10 @@
 from charm.toolbox.pairinggroup import PairingGroup, GT
 from charm.schemes.abenc.abenc_bsw07 import CPabe_BSW07
+from charm.core.engine.util import serializeObject, deserializeObject
 import pickle
 import base64
+import hashlib
+import traceback
 
 class CPABEProvider:
     """
@@ -15,8 +18,11 @@ class CPABEProvider:
         SS512 is a symmetric curve providing 80-bit security (fast for prototyping).
         MNT224 is an alternative.
         """
+        self.group_id = group_id
         self.group = PairingGroup(group_id)
         self.cpabe = CPabe_BSW07(self.group)
+        # KEM: symmetric key = SHA-256(serialized GT element)
+        self._digest = hashlib.sha256
 
     def setup(self):
         """
@@ -62,16 +68,17 @@ class CPABEProvider:
         
         try:
             r = self.group.random(GT)
+            # policy_str is handed to Charm as-is: BSW07 parses it internally,
+            # stores the string in the ciphertext and re-parses it on decrypt,
+            # so a pre-parsed policy tree cannot be cached and passed in here.
             ciphertext = self.cpabe.encrypt(pk, r, policy_str)
             
             # Derive symmetric key bytes from the group element 'r'
-            import hashlib
             r_bytes = self.group.serialize(r)
-            derived_key = hashlib.sha256(r_bytes).digest() 
+            derived_key = self._digest(r_bytes).digest()
             
             return ciphertext, derived_key
         except Exception as e:
-            import traceback
             print(f"[CPABEProvider] Encryption failed for policy: {policy_str}")
             traceback.print_exc()
             return None, None
@@ -85,8 +92,7 @@ class CPABEProvider:
             r_recovered = self.cpabe.decrypt(pk, sk, ciphertext)
             if r_recovered:
                 r_bytes = self.group.serialize(r_recovered)
-                import hashlib
-                return hashlib.sha256(r_bytes).digest()
+                return self._digest(r_bytes).digest()
             else:
                 raise Exception("Decryption failed (Attributes may not satisfy policy).")
         except Exception as e:
@@ -106,3 +112,18 @@ class CPABEProvider:
         Helper to deserialize.
         """
         return pickle.loads(base64.b64decode(b64_str))
+
+    def to_bytes(self, artifact):
+        """
+        Serializes keys/ciphertexts (dicts of group elements) with Charm's
+        group-aware encoder, e.g. to hand them to another process.
+        Unlike objectToBytes() the result is not zlib-compressed or base64
+        encoded: it only travels through in-memory pipes.
+        """
+        return pickle.dumps(serializeObject(artifact, self.group), pickle.HIGHEST_PROTOCOL)
+
+    def from_bytes(self, data):
+        """
+        Inverse of to_bytes(). Elements are rebuilt in this provider's group.
+        """
+        return deserializeObject(pickle.loads(data), self.group)
@@ -1,12 +1,14 @@
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
 import json
-import base64
+from binascii import b2a_base64, a2b_base64
 
 class AESProvider:
     """
     Provides Authenticated Symmetric Encryption (AES-256-GCM) for EHR records.
     """
+    NONCE_SIZE = 12
+    TAG_SIZE = 16
     
     @staticmethod
     def generate_key():
@@ -14,18 +16,27 @@ class AESProvider:
         return get_random_bytes(32)
 
     @staticmethod
-    def encrypt(data: bytes, key: bytes) -> dict:
+    def encrypt(data: bytes, key: bytes, nonce: bytes = None) -> dict:
         """
         Encrypts data using AES-GCM.
         Returns a dictionary containing the ciphertext, nonce, and tag (all base64 encoded strings).
+        nonce: Optional caller-managed nonce; must never repeat under the same key.
+               A random one is drawn when omitted.
         """
-        cipher = AES.new(key, AES.MODE_GCM)
+        # GCM cipher objects are single-use here: the nonce is fixed at
+        # creation and encrypt_and_digest() finalizes the object, so one is
+        # created per message rather than pooled
+        if nonce is None:
+            cipher = AES.new(key, AES.MODE_GCM)
+        else:
+            cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
         ciphertext, tag = cipher.encrypt_and_digest(data)
         
+        # binascii directly: base64.b64encode is a wrapper around the same call
         return {
-            'ciphertext': base64.b64encode(ciphertext).decode('utf-8'),
-            'nonce': base64.b64encode(cipher.nonce).decode('utf-8'),
-            'tag': base64.b64encode(tag).decode('utf-8')
+            'ciphertext': b2a_base64(ciphertext, newline=False).decode('ascii'),
+            'nonce': b2a_base64(cipher.nonce, newline=False).decode('ascii'),
+            'tag': b2a_base64(tag, newline=False).decode('ascii')
         }
 
     @staticmethod
@@ -35,12 +46,42 @@ class AESProvider:
         Expects keys: 'ciphertext', 'nonce', 'tag' (base64 strings).
         """
         try:
-            nonce = base64.b64decode(enc_dict['nonce'])
-            tag = base64.b64decode(enc_dict['tag'])
-            ciphertext = base64.b64decode(enc_dict['ciphertext'])
+            nonce = a2b_base64(enc_dict['nonce'])
+            tag = a2b_base64(enc_dict['tag'])
+            ciphertext = a2b_base64(enc_dict['ciphertext'])
+            # Only full 128-bit tags: a truncated tag would weaken the MAC
+            if len(tag) != AESProvider.TAG_SIZE:
+                raise ValueError("Unexpected tag length")
             
             cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
             data = cipher.decrypt_and_verify(ciphertext, tag)
             return data
         except (ValueError, KeyError) as e:
             raise ValueError("Decryption failed: Invalid key or corrupted data.") from e
+
+    @staticmethod
+    def encrypt_raw(data: bytes, key: bytes, nonce: bytes = None) -> bytes:
+        """
+        Same as encrypt(), but returns nonce(12) || tag(16) || ciphertext as
+        one bytes object: no base64 or dict per record. Use encrypt() where a
+        JSON-safe form is needed.
+        """
+        if nonce is None:
+            nonce = get_random_bytes(AESProvider.NONCE_SIZE)
+        cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+        ciphertext, tag = cipher.encrypt_and_digest(data)
+        return nonce + tag + ciphertext
+
+    @staticmethod
+    def decrypt_raw(blob: bytes, key: bytes) -> bytes:
+        """
+        Decrypts the output of encrypt_raw().
+        """
+        header = AESProvider.NONCE_SIZE + AESProvider.TAG_SIZE
+        if len(blob) < header:
+            raise ValueError("Decryption failed: Invalid key or corrupted data.")
+        try:
+            cipher = AES.new(key, AES.MODE_GCM, nonce=blob[:AESProvider.NONCE_SIZE])
+            return cipher.decrypt_and_verify(blob[header:], blob[AESProvider.NONCE_SIZE:header])
+        except (ValueError, TypeError) as e:
+            raise ValueError("Decryption failed: Invalid key or corrupted data.") from e
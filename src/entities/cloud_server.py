@@ -5,40 +5,56 @@ class CloudServer:
     Honest-but-curious: Follows protocol but technically could try to minimize leakage (not implemented here).
     """
 
-    def __init__(self):
-        # In-memory storage:
-        # { patient_id: { 'record': enc_record_dict, 'index': enc_index_dict, 'key_ct': cpabe_ct } }
-        self.storage = {}
+    def __init__(self, verbose=False):
+        # Per-upload/per-search logging; off by default so printing does not
+        # dominate microsecond-level timings
+        self.verbose = verbose
+        # In-memory storage: one flat dict per artifact, all keyed by patient_id
+        # (each method only touches one of them)
+        self.records = {}  # { patient_id: enc_record_bytes }
+        self.indexes = {}  # { patient_id: enc_index_dict }
+        self.key_cts = {}  # { patient_id: cpabe_ct }
 
     def upload(self, patient_id, enc_record, enc_index, enc_key_ct):
         """
         Stores the encrypted artifacts for a patient.
         """
         # In a real system, might append or update. Here we overwrite for simplicity.
-        self.storage[patient_id] = {
-            'record': enc_record,
-            'enc_index': enc_index,  # FIXED: was 'index', now 'enc_index'
-            'key_ct': enc_key_ct
-        }
-        print(f"[CloudServer] Stored data for Patient ID: {patient_id}")
+        self.records[patient_id] = enc_record
+        self.indexes[patient_id] = enc_index
+        self.key_cts[patient_id] = enc_key_ct
+        if self.verbose:
+            print(f"[CloudServer] Stored data for Patient ID: {patient_id}")
+
+    def bulk_upload(self, staged):
+        """
+        Stores many patients at once.
+        staged: { patient_id: (enc_record, enc_index, enc_key_ct) }
+        """
+        for patient_id, (enc_record, enc_index, enc_key_ct) in staged.items():
+            self.records[patient_id] = enc_record
+            self.indexes[patient_id] = enc_index
+            self.key_cts[patient_id] = enc_key_ct
+        if self.verbose:
+            print(f"[CloudServer] Stored data for {len(staged)} patients")
 
     def get_encrypted_key(self, patient_id):
         """
         Retrieves the CP-ABE encrypted key for a patient.
         Access Control Step 1: User needs this to even try decrypting.
         """
-        if patient_id in self.storage:
-            return self.storage[patient_id]['key_ct']
-        print(f"[CloudServer] Patient {patient_id} not found in storage.")
+        enc_key_ct = self.key_cts.get(patient_id)
+        if enc_key_ct is not None:
+            return enc_key_ct
+        if self.verbose:
+            print(f"[CloudServer] Patient {patient_id} not found in storage.")
         return None
 
     def get_encrypted_record(self, patient_id):
         """
         Retrieves the full encrypted record (for decryption).
         """
-        if patient_id in self.storage:
-            return self.storage[patient_id]['record']
-        return None
+        return self.records.get(patient_id)
 
     def search(self, patient_id, trapdoors):
         """
@@ -46,27 +62,29 @@ class CloudServer:
         Returns 'True' (Found) or matching document pointers if the keyword exists.
         Accepts a LIST of trapdoors (tokens) to handle forwarded privacy (historical occurrences).
         """
-        if patient_id not in self.storage:
-            print(f"[CloudServer] Search failed: Patient {patient_id} not found.")
-            return []
-
         # DSSE Search
-        # The index is a dict: { hashed_keyword: [doc_ptr] }
-        index = self.storage[patient_id]['enc_index']  # FIXED
+        # The index is a dict: { hashed_keyword: (doc_ptr,) }
+        index = self.indexes.get(patient_id)
+        if index is None:
+            if self.verbose:
+                print(f"[CloudServer] Search failed: Patient {patient_id} not found.")
+            return []
+        if not trapdoors:
+            return []
 
-        
         results = []
         # Support both list (Dynamic) and single string (Legacy/Static) if needed, but strictly list now.
-        if isinstance(trapdoors, str):
+        if isinstance(trapdoors, (str, bytes)):
             trapdoors = [trapdoors]
             
         for t in trapdoors:
             hits = index.get(t, [])
             results.extend(hits)
         
-        if results:
-            print(f"[CloudServer] Keyword Match found for Patient {patient_id}!")
-        else:
-            print(f"[CloudServer] No match for trapdoor in Patient {patient_id}.")
+        if self.verbose:
+            if results:
+                print(f"[CloudServer] Keyword Match found for Patient {patient_id}!")
+            else:
+                print(f"[CloudServer] No match for trapdoor in Patient {patient_id}.")
             
         return results
@@ -1,6 +1,62 @@
 from src.core.aes_provider import AESProvider
 from src.core.dsse_scheme import DynamicDSSEScheme
 from src.core.abe_wrapper import CPABEProvider
+import multiprocessing
+import itertools
+import os
+
+# Per-process CP-ABE context for encrypt_and_upload_many() workers
+_worker_abe = None
+_worker_pk = None
+_worker_nonces = None
+
+
+def _nonce_sequence():
+    """
+    96-bit GCM nonces: a random 32-bit prefix followed by a 64-bit counter.
+    One urandom call per sequence instead of one per encryption; nonces
+    never repeat within a sequence.
+    """
+    prefix = os.urandom(4)
+    return (prefix + i.to_bytes(8, 'big') for i in itertools.count())
+
+
+def _pool_context():
+    """
+    Start method for encrypt_and_upload_many() workers: a fork server
+    (spawn where unavailable), never a plain fork of the caller. Benchmark
+    scripts run sampler threads while encrypting, and forking a threaded
+    process can deadlock on locks those threads hold (stdout, imports).
+    Workers only need picklable init args, so nothing is lost.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def _init_encrypt_worker(group_id, pk_bytes):
+    """
+    Rebuilds the pairing group and public key inside a worker process.
+    """
+    global _worker_abe, _worker_pk, _worker_nonces
+    _worker_abe = CPABEProvider(group_id)
+    _worker_pk = _worker_abe.from_bytes(pk_bytes)
+    _worker_nonces = _nonce_sequence()
+
+
+def _encrypt_record(job):
+    """
+    Worker side of encrypt_and_upload_many(): the CPU-bound part of
+    encrypt_and_upload() for a patient that has no key or DSSE state yet.
+    """
+    patient_id, record_text, keywords, access_policy = job
+    enc_key_ct, derived_sym_key = _worker_abe.encrypt(_worker_pk, b"", access_policy)
+    enc_record = AESProvider.encrypt_raw(record_text.encode('utf-8'), derived_sym_key, next(_worker_nonces))
+    dsse = DynamicDSSEScheme(derived_sym_key)
+    enc_index = dsse.build_index(list(dict.fromkeys(keywords)), doc_id="main_record")
+    return (patient_id, _worker_abe.to_bytes(enc_key_ct), derived_sym_key,
+            enc_record, enc_index, dict(dsse.index_counters))
+
 
 class DataOwner:
     """
@@ -11,19 +67,24 @@ class DataOwner:
     3. Defining Access Policies (CP-ABE).
     """
 
-    def __init__(self):
+    def __init__(self, verbose=False):
+        # Progress output; off by default (like CloudServer) so printing
+        # stays out of timed ingest loops
+        self.verbose = verbose
         self.abe = CPABEProvider()
         self.pk = None
         self.__mk = None
         # NEW: Persistent DSSE state per patient (client-side)
         self.dsse_states = {}  # { patient_id: DynamicDSSEScheme }
         self.patient_keys = {}  # { patient_id: (derived_sym_key, enc_key_ct) }
+        self._nonces = _nonce_sequence()  # AES-GCM nonces for record encryption
 
     def setup_system(self):
         """
         Initializes the cryptographic parameters.
         """
-        print("[DataOwner] Setting up CP-ABE system...")
+        if self.verbose:
+            print("[DataOwner] Setting up CP-ABE system...")
         self.pk, self.__mk = self.abe.setup()
         return self.pk
 
@@ -31,7 +92,8 @@ class DataOwner:
         """
         Issues a secret key to a user based on their attributes.
         """
-        print(f"[DataOwner] Generating Key for attributes: {attributes}")
+        if self.verbose:
+            print(f"[DataOwner] Generating Key for attributes: {attributes}")
         return self.abe.keygen(self.pk, self.__mk, attributes)
 
     def encrypt_and_upload(self, patient_id, record_text, keywords, access_policy, server):
@@ -42,41 +104,91 @@ class DataOwner:
         3. Encrypt Key (CP-ABE)
         4. Upload to Server
         """
-        print(f"\n[DataOwner] Processing Record for Patient: {patient_id}")
+        if self.verbose:
+            print(f"\n[DataOwner] Processing Record for Patient: {patient_id}")
+        # Duplicate tokens would only add redundant trapdoors (order preserved)
+        keywords = list(dict.fromkeys(keywords))
         
         # 1. Generate or reuse symmetric key
         if patient_id in self.patient_keys:
             derived_sym_key, enc_key_ct = self.patient_keys[patient_id]
-            print(f"[DataOwner] Reusing existing key for Patient: {patient_id}")
+            if self.verbose:
+                print(f"[DataOwner] Reusing existing key for Patient: {patient_id}")
         else:
             # First time: encrypt key with CP-ABE
-            print(f"[DataOwner] Encrypting Key under Policy: {access_policy}")
+            if self.verbose:
+                print(f"[DataOwner] Encrypting Key under Policy: {access_policy}")
             enc_key_ct, derived_sym_key = self.abe.encrypt(self.pk, b"", access_policy)
             self.patient_keys[patient_id] = (derived_sym_key, enc_key_ct)
         
         # 2. Encrypt content
-        enc_record = AESProvider.encrypt(record_text.encode('utf-8'), derived_sym_key)
+        enc_record = AESProvider.encrypt_raw(record_text.encode('utf-8'), derived_sym_key, next(self._nonces))
         
         # 3. Build/Update DSSE Index (PERSISTENT STATE)
         if patient_id not in self.dsse_states:
             self.dsse_states[patient_id] = DynamicDSSEScheme(derived_sym_key)
-            print(f"[DataOwner] Created new DSSE state for Patient: {patient_id}")
+            if self.verbose:
+                print(f"[DataOwner] Created new DSSE state for Patient: {patient_id}")
         
         dsse = self.dsse_states[patient_id]
-        enc_index_update = dsse.build_index(keywords, doc_id="main_record")
         
-        # Merge update into existing index
-        if patient_id in server.storage and 'enc_index' in server.storage[patient_id]:
-            existing_index = server.storage[patient_id]['enc_index']
-            existing_index.update(enc_index_update)
-            print(f"[DataOwner] Updated existing index (+{len(enc_index_update)} trapdoors)")
+        # Merge update into existing index (streamed: no intermediate dict)
+        existing_index = server.indexes.get(patient_id)
+        if existing_index is not None:
+            before = len(existing_index)
+            existing_index.update(dsse.build_index_iter(keywords, doc_id="main_record"))
+            if self.verbose:
+                print(f"[DataOwner] Updated existing index (+{len(existing_index) - before} trapdoors)")
         else:
-            existing_index = enc_index_update
-            print(f"[DataOwner] Created new index ({len(enc_index_update)} trapdoors)")
+            existing_index = dsse.build_index(keywords, doc_id="main_record")
+            if self.verbose:
+                print(f"[DataOwner] Created new index ({len(existing_index)} trapdoors)")
         
         # 4. Upload
         server.upload(patient_id, enc_record, existing_index, enc_key_ct)
-        print("[DataOwner] Upload Complete.")
+        if self.verbose:
+            print("[DataOwner] Upload Complete.")
+
+    def encrypt_and_upload_many(self, records, access_policy, server, processes=None):
+        """
+        Parallel variant of encrypt_and_upload() for a batch of records.
+        records: List of dicts with 'patient_id', 'content' and 'keywords'.
+        
+        CP-ABE encryption (pairings), AES and index building for first-time
+        patients run in a process pool. Key/DSSE state and server uploads are
+        applied here in the parent, since neither is shared with the workers.
+        Patients that already have state fall back to encrypt_and_upload().
+        """
+        new_records, repeat_records = [], []
+        seen = set(self.dsse_states)
+        for rec in records:
+            if rec['patient_id'] in seen:
+                repeat_records.append(rec)
+            else:
+                new_records.append(rec)
+                seen.add(rec['patient_id'])
+        
+        jobs = [(rec['patient_id'], rec['content'], rec['keywords'], access_policy) for rec in new_records]
+        init_args = (self.abe.group_id, self.abe.to_bytes(self.pk))
+        if self.verbose:
+            print(f"[DataOwner] Encrypting {len(jobs)} records in a process pool...")
+        with _pool_context().Pool(processes, initializer=_init_encrypt_worker, initargs=init_args) as pool:
+            bundles = pool.map(_encrypt_record, jobs)
+        
+        staged = {}
+        for patient_id, key_ct_bytes, derived_sym_key, enc_record, enc_index, counters in bundles:
+            enc_key_ct = self.abe.from_bytes(key_ct_bytes)
+            self.patient_keys[patient_id] = (derived_sym_key, enc_key_ct)
+            dsse = DynamicDSSEScheme(derived_sym_key)
+            dsse.index_counters.update(counters)
+            self.dsse_states[patient_id] = dsse
+            staged[patient_id] = (enc_record, enc_index, enc_key_ct)
+        server.bulk_upload(staged)
+        
+        for rec in repeat_records:
+            self.encrypt_and_upload(rec['patient_id'], rec['content'], rec['keywords'], access_policy, server)
+        if self.verbose:
+            print("[DataOwner] Batch Upload Complete.")
 
     def add_keywords(self, patient_id, new_keywords, server):
         """
@@ -86,17 +198,20 @@ class DataOwner:
         if patient_id not in self.dsse_states:
             raise ValueError(f"No DSSE state for patient {patient_id}. Must encrypt_and_upload first.")
         
-        if patient_id not in server.storage:
+        if patient_id not in server.indexes:
             raise ValueError(f"Patient {patient_id} not found on server.")
         
-        print(f"\n[DataOwner] Adding {len(new_keywords)} keywords to Patient: {patient_id}")
+        new_keywords = list(dict.fromkeys(new_keywords))
+        if self.verbose:
+            print(f"\n[DataOwner] Adding {len(new_keywords)} keywords to Patient: {patient_id}")
         
         dsse = self.dsse_states[patient_id]
         update_index = dsse.build_index(new_keywords, doc_id="main_record")
         
         # Merge into server-side index (FIXED: use 'enc_index' not 'index')
-        server.storage[patient_id]['enc_index'].update(update_index)
-        print(f"[DataOwner] Index updated (+{len(update_index)} new trapdoors)")
+        server.indexes[patient_id].update(update_index)
+        if self.verbose:
+            print(f"[DataOwner] Index updated (+{len(update_index)} new trapdoors)")
 
         
         return len(update_index)
@@ -108,27 +223,26 @@ class DataOwner:
         if patient_id not in self.dsse_states:
             raise ValueError(f"No DSSE state for patient {patient_id}.")
         
-        if patient_id not in server.storage:
+        if patient_id not in server.indexes:
             raise ValueError(f"Patient {patient_id} not found on server.")
         
-        print(f"\n[DataOwner] Deleting {len(keywords_to_delete)} keywords from Patient: {patient_id}")
+        if self.verbose:
+            print(f"\n[DataOwner] Deleting {len(keywords_to_delete)} keywords from Patient: {patient_id}")
         
         dsse = self.dsse_states[patient_id]
-        index = server.storage[patient_id]['enc_index']  # FIXED
-
+        pop = server.indexes[patient_id].pop
         
         deleted_count = 0
         for kw in keywords_to_delete:
             if kw in dsse.index_counters:
-                count = dsse.index_counters[kw]
-                for c in range(1, count + 1):
-                    trapdoor = dsse._hash_keyword_with_count(kw, c)
-                    if trapdoor in index:
-                        del index[trapdoor]
-                        deleted_count += 1
+                # Same trapdoors a search would use (cached per keyword);
+                # one pop per trapdoor instead of a membership test + del
+                trapdoors = dsse.generate_search_tokens(kw)
+                deleted_count += sum(1 for t in trapdoors if pop(t, None) is not None)
                 dsse.index_counters[kw] = 0
         
-        print(f"[DataOwner] Deleted {deleted_count} trapdoors")
+        if self.verbose:
+            print(f"[DataOwner] Deleted {deleted_count} trapdoors")
         return deleted_count
     
     def generate_search_tokens(self, patient_id, keyword):
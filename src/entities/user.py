@@ -18,6 +18,9 @@ class User:
         self.sk = secret_key
         self.pk = public_key
         self.abe = CPABEProvider()
+        # { patient_id: (enc_key_ct, sym_key) }: filled by every successful
+        # lookup, read only by decrypt_full_record()
+        self._session_keys = {}
 
     def attempt_access_and_search(self, patient_id, search_keyword, server, owner):
         """
@@ -26,23 +29,46 @@ class User:
         """
         print(f"\n[User: {self.name}] Attempting to access Patient {patient_id}...")
         
+        if self.lookup_patient_key(patient_id, server) is None:
+            return False
+        return self.search_patient(patient_id, search_keyword, server, owner)
+
+    def lookup_patient_key(self, patient_id, server):
+        """
+        Patient Lookup phase: fetch and CP-ABE decrypt the patient's key.
+        Returns the symmetric key, or None if missing or access is denied.
+        """
         # 1. Fetch Encrypted Key
         enc_key_ct = server.get_encrypted_key(patient_id)
         if enc_key_ct is None:
-            return False
+            return None
 
         # 2. Try to Decrypt the Key (Patient Lookup Phase)
+        # Always a real CP-ABE decryption: the lookup is the access check and
+        # is what experiment_4 measures per query
         try:
             sym_key = self.abe.decrypt(self.pk, self.sk, enc_key_ct)
+            self._session_keys[patient_id] = (enc_key_ct, sym_key)
             print("  -> [Success] Key decrypted! Access Granted.")
+            return sym_key
         except Exception as e:
             print(f"  -> [Failure] Access Denied. CP-ABE Policy check failed. {e}")
-            return False
+            return None
 
+    def search_patient(self, patient_id, search_keyword, server, owner):
+        """
+        Search phase, run after a successful lookup_patient_key().
+        """
         # 3. Perform Search using owner's DSSE state (CORRECTED)
         print(f"  -> Searching for keyword: '{search_keyword}'")
         trapdoors = owner.generate_search_tokens(patient_id, search_keyword)
-        
+        return self.search_with_trapdoor(patient_id, trapdoors, server)
+
+    def search_with_trapdoor(self, patient_id, trapdoors, server):
+        """
+        Search phase with trapdoors generated ahead of time, e.g. shared by
+        repeated queries for the same keyword.
+        """
         results = server.search(patient_id, trapdoors)
         
         if results:
@@ -56,16 +82,22 @@ class User:
         """
         Decrypts the actual content of the record.
         """
-        # (This repeats the key decryption... in a real app, we'd cache the session key)
         enc_key_ct = server.get_encrypted_key(patient_id)
-        enc_record_dict = server.get_encrypted_record(patient_id)
+        enc_record = server.get_encrypted_record(patient_id)
         
-        if enc_key_ct is None or enc_record_dict is None:
+        if enc_key_ct is None or enc_record is None:
             return "Error: Missing patient data (key or record) on server."
         
         try:
-            sym_key = self.abe.decrypt(self.pk, self.sk, enc_key_ct)
-            plaintext = AESProvider.decrypt(enc_record_dict, sym_key)
+            # Session key cache: reuse the key from an earlier lookup while the
+            # server still holds the same key ciphertext (re-encryption invalidates it)
+            cached = self._session_keys.get(patient_id)
+            if cached is not None and cached[0] is enc_key_ct:
+                sym_key = cached[1]
+            else:
+                sym_key = self.abe.decrypt(self.pk, self.sk, enc_key_ct)
+                self._session_keys[patient_id] = (enc_key_ct, sym_key)
+            plaintext = AESProvider.decrypt_raw(enc_record, sym_key)
             return plaintext.decode('utf-8')
         except Exception as e:
             return f"Error: {e}"
@@ -0,0 +1,17 @@
+import os
+
+
+def pin_to_single_core():
+    """
+    Pins this process to one CPU so timed sections are not migrated between
+    cores mid-measurement. No-op where CPU affinity is unsupported.
+    Process priority is left alone: raising it needs privileges, and a
+    silently failing os.nice() would make runs differ from one another.
+    """
+    if not hasattr(os, 'sched_setaffinity'):  # Linux only
+        return
+    try:
+        # Highest-numbered CPU: CPU 0 usually services most interrupts
+        os.sched_setaffinity(0, {max(os.sched_getaffinity(0))})
+    except OSError:
+        pass
@@ -1,6 +1,7 @@
 import pandas as pd
 import os
 import random
+import itertools
 
 class DataLoader:
     """
@@ -27,15 +28,19 @@ class DataLoader:
 
     def _load_real_csv(self, sample_size):
         try:
-            df = pd.read_csv(self.filepath, nrows=sample_size * 2) # Read a bit more to filter
+            # Only the columns used below, parsed as plain strings (no dtype inference)
+            df = pd.read_csv(self.filepath, nrows=sample_size * 2, dtype=str, # Read a bit more to filter
+                             usecols=lambda c: c.upper() in ('SUBJECT_ID', 'DIAGNOSIS', 'TEXT'))
             # Check for standard MIMIC-III columns (ADMISSIONS.csv usually has diagnosis)
             # Or NOTEEVENTS.csv has text
             
             # Simple Adaptation: Map whatever columns we find to our schema
-            cols = df.columns.str.upper()
+            # (normalized once, so mixed-case headers match the lookups below)
+            df.columns = df.columns.str.upper()
             
             data_list = []
-            for _, row in df.head(sample_size).iterrows():
+            # Plain dicts per row instead of a pandas Series per row
+            for row in df.head(sample_size).to_dict(orient='records'):
                 # Extract usable fields
                 pid = str(row.get('SUBJECT_ID', f"P_{random.randint(1000,9999)}"))
                 
@@ -46,7 +51,7 @@ class DataLoader:
                 content = f"Patient ID: {pid}\nDiagnosis: {diagnosis}\nNotes: {notes}"
                 
                 # Extract Keywords (Naive extraction from Diagnosis)
-                keywords = [k.strip().lower() for k in diagnosis.split() if len(k) > 3]
+                keywords = list(dict.fromkeys(k.strip().lower() for k in diagnosis.split() if len(k) > 3))
                 
                 data_list.append({
                     'patient_id': pid,
@@ -70,6 +75,13 @@ class DataLoader:
         
         medications = ["Metoprolol", "Furosemide", "Insulin", "Vancomycin", "Lisinopril"]
         
+        # Keyword lists are built once per diagnosis / medication pair. The
+        # picks themselves keep the original choice()/sample() call order,
+        # so a given random seed still reproduces the same dataset
+        med_pairs = [", ".join(pair) for pair in itertools.permutations(medications, 2)]
+        diag_keywords = {d: d.lower().split() for d in diagnoses}
+        med_keywords = {m: m.lower().replace(',', '').split() for m in med_pairs}
+        
         data_list = []
         for i in range(count):
             pid = f"PATIENT_{10000 + i}"
@@ -86,7 +98,7 @@ class DataLoader:
             )
             
             # Keywords: Diagnosis words + Meds
-            keywords = diag.lower().split() + meds.lower().replace(',', '').split()
+            keywords = list(dict.fromkeys(diag_keywords[diag] + med_keywords[meds]))
             
             data_list.append({
                 'patient_id': pid,